@@ -10,6 +10,7 @@ After=network.target
 [Service]
 WorkingDirectory={}
 ExecStart={}/run.sh
+ExecReload=/bin/kill -HUP $MAINPID
 
 [Install]
 WantedBy=multi-user.target
@@ -0,0 +1,79 @@
+import ipaddress
+
+
+class IPIndex:
+    """
+    Binary prefix trie of IP networks, one trie per address family.
+    Lookups walk at most one node per prefix bit, so the cost does not
+    grow with the amount of networks stored.
+
+    Args:
+        networks: Iterable of IP addresses or CIDR blocks as strings
+    """
+
+    def __init__(self, networks=()):
+        self.roots = {4: [None, None, False], 6: [None, None, False]}
+
+        for network in networks:
+            try:
+                self.add(network)
+            except ValueError:
+                print("WARNING: ignored IP {} is not a valid IP address or CIDR block, skipping".format(network))
+
+    def add(self, network):
+        """
+        Adds an IP address or CIDR block to the index
+
+        Args:
+            network: IP address or CIDR block as a string e.g "10.0.0.0/8"
+
+        Raises:
+            ValueError: If the string is not a valid IP address or CIDR block
+        """
+
+        network = ipaddress.ip_network(network, strict=False)
+        node = self.roots[network.version]
+        address = int(network.network_address)
+        max_length = network.max_prefixlen
+
+        for bit in range(network.prefixlen):
+            if node[2]:
+                return  # A wider network already covers this one
+
+            branch = (address >> (max_length - 1 - bit)) & 1
+            if node[branch] is None:
+                node[branch] = [None, None, False]
+            node = node[branch]
+
+        node[0] = node[1] = None  # Narrower networks are now redundant
+        node[2] = True
+
+    def __contains__(self, ip_address):
+        """
+        Checks if the IP address falls within any network in the index
+
+        Args:
+            ip_address: IP address as a string
+
+        Returns:
+            True if the IP is covered by the index, False if not or the string is not an IP
+        """
+
+        try:
+            address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return False
+
+        node = self.roots[address.version]
+        value = int(address)
+        max_length = address.max_prefixlen
+
+        for bit in range(max_length):
+            if node[2]:
+                return True
+
+            node = node[(value >> (max_length - 1 - bit)) & 1]
+            if node is None:
+                return False
+
+        return node[2]
@@ -1,6 +1,7 @@
 import json
 import os
 import re
+import signal
 import socket
 import subprocess
 import threading
@@ -21,59 +22,82 @@ from datetime import datetime
 
 from .exceptions import DatabaseConfigException
 from .database import SqliteConnection, RedisConnection
+from .ip_index import IPIndex
 
 
 class PyFilter(object):
     def __init__(self, file_path="Config/config.json"):
+        self.config_path = file_path
+
         with open(file_path, "r") as config:
             data = json.load(config)
 
         self.settings = data["settings"]
         self.log_settings = data["logging"]
         self.rules = data["settings"]["rules"]
+        self.ignored_ips = IPIndex(self.settings["ignored_ips"])
 
         self.lock = threading.Lock()
 
         self.ip_blacklisted = False
 
+        self.tailers = {}
+        self.reload_event = threading.Event()
+
         self.ip_dict = {key: {} for key in self.rules}
-        self.__setup_regex()
+        self.regex = self.__setup_regex(self.rules)
         self.__setup_database(data)
 
         if geoip2 is not None:
             self.reader = geoip2.database.Reader("GeoLite2-Country.mmdb")
 
-    def read_files(self, log_file, pattern_type="ssh"):
+    def read_files(self, log_file, pattern_type="ssh", stop_event=None):
         """
         Reads the log files for the specified regex pattern
 
         Args:
             log_file: log file to be read and monitored
             pattern_type: pattern_type is a string to select the rule from the config
+            stop_event: threading.Event which detaches the reader from the log file once set,
+                        the reader also sets it itself when the log file has gone
         """
 
-        print("Checking {} logs".format(pattern_type.title()))
+        if stop_event is None:
+            stop_event = threading.Event()
+
+        print("Checking {} logs ({})".format(pattern_type.title(), log_file))
+
+        while not stop_event.is_set():
+            try:
+                inode = os.stat(log_file).st_ino
+            except OSError:
+                stop_event.set()  # File has gone, the log watcher will reattach if it comes back
+                return
 
-        while True:
-            inode = os.stat(log_file).st_ino
             with open(log_file, "r") as f:
-                while True:
+                while not stop_event.is_set():
                     where = f.tell()
                     line = f.readline()
                     if not line:
 
-                        if inode != os.stat(log_file).st_ino:
+                        try:
+                            if inode != os.stat(log_file).st_ino:
+                                break
+                        except OSError:
                             break
 
-                        time.sleep(1)
+                        stop_event.wait(1)
                         f.seek(where)
                         continue
 
-                    for regex_pattern in self.regex[pattern_type]:
-                        found = regex_pattern[0].findall(line)
+                    try:
+                        for regex_pattern in self.regex[pattern_type]:
+                            found = regex_pattern[0].findall(line)
 
-                        if found:
-                            self.filter(pattern_type, found[0], regex_pattern[1])
+                            if found:
+                                self.filter(pattern_type, found[0], regex_pattern[1])
+                    except Exception as e:
+                        print("WARNING: skipping line in {} - {}: {}".format(log_file, type(e).__name__, e))
 
                     time.sleep(0.0001)  # Ensure it doesnt kill CPU
 
@@ -91,11 +115,15 @@ class PyFilter(object):
         cond = pattern_type in ("apache", "nginx")
 
         ip_address = found[not cond]
-        time_obj = datetime.strptime(found[cond], self.rules[pattern_type]["time_format"])
+
+        if ip_address in self.ignored_ips:
+            return  # Allowlisted IPs skip timestamp parsing and DNS lookups
 
         if cond and int(found[3]) not in self.rules[pattern_type]["http_status_blocks"]:
             return
 
+        time_obj = datetime.strptime(found[cond], self.rules[pattern_type]["time_format"])
+
         this_year = datetime.now().year
 
         if time_obj.year != this_year:
@@ -107,36 +135,38 @@ class PyFilter(object):
             ip_address = socket.gethostbyname(ip_address)
             ip_type = self.__check_ip(ip_address)
 
-        if ip_address not in self.settings["ignored_ips"]:
-            if instant_ban:
-                if self.database_connection.select(ip_address) is not None:
-                    return
+            if ip_address in self.ignored_ips:
+                return
 
-                country = ""
-                country_log = ""
+        if instant_ban:
+            if self.database_connection.select(ip_address) is not None:
+                return
 
-                if geoip2 is not None:
-                    try:
-                        country = self.reader.country(ip_address).country.name
-                    except geoip2.errors.AddressNotFoundError:
-                        country = "unknown!"
+            country = ""
+            country_log = ""
 
-                    country_log = "The IP was from {}.".format(
-                        country
-                    )
+            if geoip2 is not None:
+                try:
+                    country = self.reader.country(ip_address).country.name
+                except geoip2.errors.AddressNotFoundError:
+                    country = "unknown!"
 
-                log_msg = "IP: {} has been blacklisted and the firewall rules have been updated." \
-                          " Acquired an instant ban via {}. {}\n".format(ip_address, pattern_type, country_log)
+                country_log = "The IP was from {}.".format(
+                    country
+                )
+
+            log_msg = "IP: {} has been blacklisted and the firewall rules have been updated." \
+                      " Acquired an instant ban via {}. {}\n".format(ip_address, pattern_type, country_log)
 
-                if self.log_settings["active"]:
-                    self.log(log_msg)
-                    print(log_msg, end='')
+            if self.log_settings["active"]:
+                self.log(log_msg)
+                print(log_msg, end='')
 
-                return self.blacklist(ip_address, log_msg=log_msg, ip_type=ip_type, country=country)
+            return self.blacklist(ip_address, log_msg=log_msg, ip_type=ip_type, country=country)
 
-            if ip_address not in self.ip_dict[pattern_type]:
-                self.ip_dict[pattern_type][ip_address] = {"amount": 0, "last_request": None}
-            self.check(ip_address, pattern_type, time_obj, ip_type)
+        if ip_address not in self.ip_dict[pattern_type]:
+            self.ip_dict[pattern_type][ip_address] = {"amount": 0, "last_request": None}
+        self.check(ip_address, pattern_type, time_obj, ip_type)
 
     def check(self, ip_address, pattern_type, time_object, ip_type="v4"):
         """
@@ -312,23 +342,42 @@ class PyFilter(object):
         ip_type = self.__check_ip(ip_address)
         self.blacklist(ip_address, False, ip_type=ip_type)
 
-    def __setup_regex(self):
+    def __setup_regex(self, rules):
         """
-        Sets up the needed regex patterns
+        Sets up the needed regex patterns, reusing already compiled patterns which have not changed
+
+        Args:
+            rules: A dictionary of rules passed from config.json
+
+        Returns:
+            A dictionary of rule names to lists of compiled patterns and their instant ban flag
+
+        Raises:
+            re.error: If a regex pattern fails to compile
         """
 
-        self.regex = {}
-        for key in self.ip_dict:
-            self.regex[key] = []
-            for regex in self.rules[key]["regex_patterns"]:
+        compiled = {}
+        for regex_patterns in getattr(self, "regex", {}).values():
+            for regex_pattern in regex_patterns:
+                compiled[regex_pattern[0].pattern] = regex_pattern[0]
+
+        regex_dict = {}
+        for key in rules:
+            regex_dict[key] = []
+            for regex in rules[key]["regex_patterns"]:
                 instant_ban = False
                 if not isinstance(regex, str):
                     if isinstance(regex[1], str):
-                        regex = regex[0].format("|".join(self.rules[key][regex[1]]))
+                        regex = regex[0].format("|".join(rules[key][regex[1]]))
                     elif isinstance(regex[1], bool):
                         regex = regex[0]
                         instant_ban = True
-                self.regex[key].append([re.compile(regex), instant_ban])
+
+                if regex not in compiled:
+                    compiled[regex] = re.compile(regex)
+                regex_dict[key].append([compiled[regex], instant_ban])
+
+        return regex_dict
 
     def __setup_database(self, data):
         """
@@ -365,6 +414,119 @@ class PyFilter(object):
                 return False
             return self.__check_ip(ip_address, True)
 
+    def reload_config(self):
+        """
+        Reloads config.json without restarting. Unchanged regex patterns and the
+        failed attempts of rules which still exist are kept. Database settings
+        are only read on startup. If the new config is invalid the current one is kept.
+        """
+
+        try:
+            with open(self.config_path, "r") as config:
+                data = json.load(config)
+
+            settings = data["settings"]
+            rules = settings["rules"]
+            log_settings = data["logging"]
+            ignored_ips = IPIndex(settings["ignored_ips"])
+            regex = self.__setup_regex(rules)
+        except (OSError, ValueError, KeyError, TypeError, IndexError, AttributeError, re.error) as e:
+            print("Failed to reload {}, keeping the current config: {}".format(self.config_path, e))
+            return
+
+        for (key, log_file), (thread, stop_event) in list(self.tailers.items()):
+            if key not in rules:
+                print("No longer checking {} logs ({})".format(key.title(), log_file))
+                stop_event.set()
+                thread.join(timeout=5)  # Let the reader finish its current line before the rule state goes
+                del self.tailers[(key, log_file)]
+
+        self.settings = settings
+        self.log_settings = log_settings
+        self.ignored_ips = ignored_ips
+        self.regex = regex
+        self.rules = rules
+        self.ip_dict = {key: self.ip_dict.get(key, {}) for key in rules}
+
+        print("Reloaded config from {}".format(self.config_path))
+
+    def watch_logs(self, loop=True):
+        """
+        Re-evaluates the log_files patterns of every rule, attaching readers to new log files
+        and detaching them from ones which have gone. Also reloads the config when requested.
+        """
+
+        while True:
+            if self.reload_event.is_set():
+                self.reload_event.clear()
+                self.reload_config()
+
+            self.__sync_log_files()
+
+            if not loop:
+                return
+
+            self.reload_event.wait(self.settings.get("log_watch_time", 30))
+
+    def __request_reload(self, signum, frame):
+        """
+        Signal handler asking the log watcher to reload the config
+
+        Args:
+            signum: The signal number received
+            frame: The current stack frame
+        """
+
+        self.reload_event.set()
+
+    def __sync_log_files(self, startup=False):
+        """
+        Starts a reader thread for every log file matched by the rules which isn't being read
+        and stops readers whose log file no longer matches
+
+        Args:
+            startup: Boolean to print warnings about the rules which are only useful on launch
+        """
+
+        log_files = set()
+
+        for key in self.rules:
+            log_files_pattern = self.rules[key].get("log_files")
+
+            if not log_files_pattern:
+                if startup:
+                    print("No log files pattern to check within rule: {}".format(key.title()))
+                continue
+
+            for log_file in glob.glob(log_files_pattern):
+                if not os.path.isfile(log_file):
+                    if startup:
+                        print("WARNING: file {} could not be found".format(log_file))
+                    continue
+
+                log_files.add((key, log_file))
+
+        for (key, log_file), (thread, stop_event) in list(self.tailers.items()):
+            if (key, log_file) in log_files:
+                if thread.is_alive() or not stop_event.is_set():
+                    continue  # Readers which crashed are not restarted so the file isn't replayed
+
+            elif thread.is_alive():
+                print("No longer checking {} logs ({})".format(key.title(), log_file))
+
+            stop_event.set()
+            del self.tailers[(key, log_file)]
+
+        for key, log_file in log_files:
+            if (key, log_file) in self.tailers:
+                continue
+
+            stop_event = threading.Event()
+            thread = threading.Thread(target=self.read_files, args=(log_file, key, stop_event), name=key)
+            thread.daemon = True
+            thread.start()
+            self.tailers[(key, log_file)] = (thread, stop_event)
+
     def run(self):
         """
         Creates the threads needed for PyFilter to run. This method starts PyFilter.
@@ -379,23 +541,16 @@ class PyFilter(object):
                 with open(ip_file) as f:
                     subprocess.call([command], stdin=f)
 
-        threads = []
-
-        for key in self.rules:
-            log_files_pattern = self.rules[key]["log_files"]
-
-            if not log_files_pattern:
-                print("No log files pattern to check within rule: {}".format(key.title()))
-                continue
-
-            for log_file in glob.glob(log_files_pattern):
-                if not os.path.isfile(log_file):
-                    print("WARNING: file {} could not be found".format(log_file))
-                    continue
+        self.__sync_log_files(startup=True)
 
-                threads.append(threading.Thread(target=self.read_files, args=(log_file, key), name=key))
+        # The watcher always runs on its own thread so the main thread, which handles
+        # the signal, never waits on reload_event itself
+        signal.signal(signal.SIGHUP, self.__request_reload)  # Reload config.json with `kill -HUP`
 
-        threads.append(threading.Thread(target=self.make_persistent, name="persistent"))
+        threads = [
+            threading.Thread(target=self.make_persistent, name="persistent"),
+            threading.Thread(target=self.watch_logs, name="watcher")
+        ]
 
         for thread in threads:
             thread.daemon = True
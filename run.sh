@@ -1,3 +1,3 @@
 #!/usr/bin/env bash
 
-sudo python3 run.py
\ No newline at end of file
+exec sudo python3 run.py
\ No newline at end of file
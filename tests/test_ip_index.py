@@ -0,0 +1,70 @@
+import unittest
+
+from pyFilter.ip_index import IPIndex
+
+
+class IPIndexTest(unittest.TestCase):
+    def test_single_address(self):
+        index = IPIndex(["127.0.0.1"])
+
+        self.assertIn("127.0.0.1", index)
+        self.assertNotIn("127.0.0.2", index)
+
+    def test_cidr_block(self):
+        index = IPIndex(["10.0.0.0/8"])
+
+        self.assertIn("10.0.0.0", index)
+        self.assertIn("10.255.255.255", index)
+        self.assertNotIn("11.0.0.0", index)
+        self.assertNotIn("9.255.255.255", index)
+
+    def test_zero_prefix(self):
+        index = IPIndex(["0.0.0.0/0"])
+
+        self.assertIn("1.2.3.4", index)
+        self.assertIn("255.255.255.255", index)
+        self.assertNotIn("::1", index)
+
+    def test_v4_and_v6_are_separate(self):
+        index = IPIndex(["2001:db8::/32", "192.168.0.1"])
+
+        self.assertIn("2001:db8::1", index)
+        self.assertIn("2001:db8:ffff::1", index)
+        self.assertNotIn("2001:db9::1", index)
+        self.assertIn("192.168.0.1", index)
+        self.assertNotIn("::ffff:192.168.0.1", index)
+
+    def test_full_length_v6(self):
+        index = IPIndex(["2001:db8::1/128"])
+
+        self.assertIn("2001:db8::1", index)
+        self.assertNotIn("2001:db8::2", index)
+
+    def test_narrow_block_before_wider(self):
+        index = IPIndex(["192.168.1.0/24", "192.168.0.0/16"])
+
+        self.assertIn("192.168.1.5", index)
+        self.assertIn("192.168.200.5", index)
+        self.assertNotIn("192.169.0.1", index)
+
+    def test_wider_block_before_narrow(self):
+        index = IPIndex(["192.168.0.0/16", "192.168.1.0/24"])
+
+        self.assertIn("192.168.200.5", index)
+
+    def test_non_ip_strings(self):
+        index = IPIndex(["0.0.0.0/0", "::/0"])
+
+        self.assertNotIn("example.com", index)
+        self.assertNotIn("", index)
+        self.assertNotIn("123.456.789.1", index)
+
+    def test_invalid_entries_are_skipped(self):
+        index = IPIndex(["127.0.0.1", "123.456.789.1", "not an ip"])
+
+        self.assertIn("127.0.0.1", index)
+        self.assertRaises(ValueError, index.add, "123.456.789.1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import copy
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pyFilter.py_filter import PyFilter
+
+
+class PyFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_directory = os.path.join(self.directory, "logs")
+        os.mkdir(self.log_directory)
+
+        with open("Config/config.default.json") as f:
+            self.config = json.load(f)
+
+        self.config["settings"]["rules"]["ssh"]["log_files"] = os.path.join(self.log_directory, "*.log")
+        self.config["logging"]["active"] = False
+        self.config["sqlite"]["database"] = os.path.join(self.directory, "PyFilter.db")
+
+        self.config_path = os.path.join(self.directory, "config.json")
+        self.write_config(self.config)
+
+        self.py_filter = PyFilter(self.config_path)
+
+    def tearDown(self):
+        for thread, stop_event in self.py_filter.tailers.values():
+            stop_event.set()
+            thread.join()
+
+        self.py_filter.database_connection.sqlite_connection.close()
+        shutil.rmtree(self.directory)
+
+    def write_config(self, config):
+        with open(self.config_path, "w") as f:
+            json.dump(config, f)
+
+    def write_log(self, name, text=""):
+        log_file = os.path.join(self.log_directory, name)
+        with open(log_file, "a") as f:
+            f.write(text)
+        return log_file
+
+    def wait_for(self, condition, timeout=5):
+        end = time.time() + timeout
+        while not condition() and time.time() < end:
+            time.sleep(0.05)
+        return condition()
+
+    def test_new_log_file_is_attached(self):
+        self.py_filter.watch_logs(loop=False)
+        self.assertEqual(self.py_filter.tailers, {})
+
+        log_file = self.write_log("auth.log")
+        self.py_filter.watch_logs(loop=False)
+
+        self.assertIn(("ssh", log_file), self.py_filter.tailers)
+
+    def test_removed_log_file_is_detached(self):
+        log_file = self.write_log("auth.log")
+        self.py_filter.watch_logs(loop=False)
+        thread = self.py_filter.tailers[("ssh", log_file)][0]
+
+        os.remove(log_file)
+        thread.join(timeout=5)
+        self.py_filter.watch_logs(loop=False)
+
+        self.assertFalse(thread.is_alive())
+        self.assertNotIn(("ssh", log_file), self.py_filter.tailers)
+
+    def test_bad_line_does_not_replay_file(self):
+        log_file = self.write_log(
+            "auth.log",
+            "Feb 30 10:00:00 host sshd: Failed password for root from 1.2.3.4 port 22\n"
+            "Oct 19 10:00:00 host sshd: Failed password for root from 1.2.3.5 port 22\n"
+        )
+        self.py_filter.watch_logs(loop=False)
+        thread = self.py_filter.tailers[("ssh", log_file)][0]
+
+        self.assertTrue(self.wait_for(lambda: "1.2.3.5" in self.py_filter.ip_dict["ssh"]))
+        self.py_filter.watch_logs(loop=False)
+
+        self.assertTrue(thread.is_alive())
+        self.assertIs(self.py_filter.tailers[("ssh", log_file)][0], thread)
+        self.assertEqual(self.py_filter.ip_dict["ssh"]["1.2.3.5"]["amount"], 0)
+
+    def test_reload_keeps_state_of_existing_rules(self):
+        self.py_filter.ip_dict["ssh"]["1.2.3.4"] = {"amount": 2, "last_request": None}
+        self.py_filter.ip_dict["mysql"]["1.2.3.5"] = {"amount": 1, "last_request": None}
+
+        config = copy.deepcopy(self.config)
+        del config["settings"]["rules"]["mysql"]
+        self.write_config(config)
+        self.py_filter.reload_config()
+
+        self.assertEqual(self.py_filter.ip_dict["ssh"]["1.2.3.4"]["amount"], 2)
+        self.assertNotIn("mysql", self.py_filter.ip_dict)
+        self.assertNotIn("mysql", self.py_filter.regex)
+
+    def test_invalid_config_keeps_current_config(self):
+        settings = self.py_filter.settings
+        regex = self.py_filter.regex
+        ignored_ips = self.py_filter.ignored_ips
+
+        bad_regex = copy.deepcopy(self.config)
+        bad_regex["settings"]["failed_attempts"] = 99
+        bad_regex["settings"]["rules"]["ssh"]["regex_patterns"].append("([bad")
+
+        missing_key = copy.deepcopy(self.config)
+        del missing_key["settings"]["rules"]["ssh"]["regex_patterns"]
+
+        for write in (lambda: self.write_config(bad_regex),
+                      lambda: self.write_config(missing_key),
+                      lambda: open(self.config_path, "w").write("{not json")):
+            write()
+            self.py_filter.reload_config()
+
+            self.assertIs(self.py_filter.settings, settings)
+            self.assertIs(self.py_filter.regex, regex)
+            self.assertIs(self.py_filter.ignored_ips, ignored_ips)
+
+    def test_unchanged_regex_is_reused(self):
+        rules = copy.deepcopy(self.config["settings"]["rules"])
+        rules["ssh"]["regex_patterns"].append("new pattern (.*) (.*)")
+
+        regex = self.py_filter._PyFilter__setup_regex(rules)
+
+        self.assertIs(regex["ssh"][0][0], self.py_filter.regex["ssh"][0][0])
+        self.assertEqual(regex["ssh"][-1][0].pattern, "new pattern (.*) (.*)")
+
+
+if __name__ == "__main__":
+    unittest.main()